@@ -26,6 +26,14 @@ INDEX_SETTINGS = {
 BATCH_SIZE = 100  # Number of images to process in each batch
 MAX_RETRIES = 3   # Number of retries for API calls
 TIMEOUT = 300     # Timeout for API calls in seconds
+UPLOAD_WORKERS = 32  # Number of concurrent GCS uploads
+DISK_WORKERS = 2     # Number of threads reading images from local disk
+ASSET_WORKERS = 32   # Number of concurrent asset creation requests
+MAX_INFLIGHT = 64    # Maximum number of file uploads in flight at once
+QUERY_PRIORITY = 0    # Upload priority for search queries (lower runs first)
+INGEST_PRIORITY = 10  # Upload priority for bulk ingestion
+SEARCH_CACHE_SIZE = 1024  # Number of similarity search results kept in memory
+SEARCH_CACHE_TTL = 3600   # Lifetime of cached search results in seconds
 
 # Supported image formats
 SUPPORTED_FORMATS = ('.jpg', '.jpeg', '.png')
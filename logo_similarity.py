@@ -2,12 +2,22 @@
 """Logo Similarity Analyzer using Google Cloud Vision Warehouse API."""
 
 import os
+import time
+import random
 import argparse
+import functools
+import itertools
+import json
 import logging
+import mimetypes
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from tqdm import tqdm
 
 import requests
+from requests.adapters import HTTPAdapter
 from google.cloud import storage
 
 from config import (
@@ -18,10 +28,31 @@ from config import (
     BATCH_SIZE,
     MAX_RETRIES,
     TIMEOUT,
+    UPLOAD_WORKERS,
+    DISK_WORKERS,
+    ASSET_WORKERS,
+    MAX_INFLIGHT,
+    QUERY_PRIORITY,
+    INGEST_PRIORITY,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
     SUPPORTED_FORMATS,
     SPREADSHEET_RANGE
 )
-from utils import get_access_token, upload_to_gcs, save_to_spreadsheet
+from utils import (
+    get_access_token,
+    iter_images,
+    read_file,
+    hash_file,
+    PriorityExecutor,
+    PrioritySemaphore,
+    chain_future,
+    upload_to_gcs,
+    upload_bytes,
+    list_existing_blobs,
+    save_to_spreadsheet
+)
+from utils.auth import TOKEN_REFRESH_MARGIN
 
 # Set up logging
 logging.basicConfig(
@@ -30,36 +61,89 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# HTTP status codes worth retrying (throttling and transient server errors)
+RETRIABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
 class LogoSimilarityAnalyzer:
     def __init__(self, project_number=PROJECT_NUMBER, location=LOCATION):
         self.project_number = project_number
         self.location = location
         self.base_url = "https://warehouse-visionai.googleapis.com/v1"
-        self.token = get_access_token()
-        
-    def _make_request(self, method, endpoint, data=None, retry_count=0):
-        """Make HTTP request to Vision Warehouse API with retry logic."""
-        headers = {
+        self.token, self._token_expiry = get_access_token()
+        self._headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json; charset=utf-8"
         }
+        self._disk_pool = ThreadPoolExecutor(max_workers=DISK_WORKERS)
+        self._upload_pool = PriorityExecutor(max_workers=UPLOAD_WORKERS)
+        self._asset_pool = ThreadPoolExecutor(max_workers=ASSET_WORKERS)
+        
+        # Cap concurrent file uploads across all pools to stay under GCS rate
+        # limits; free slots go to query uploads before bulk ingestion
+        self._sem = PrioritySemaphore(MAX_INFLIGHT)
+        
+        # Reuse pooled keep-alive connections across API calls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=0)
+        self.session.mount("https://", adapter)
+        
+        # LRU cache of search results keyed by query image content
+        self._search_cache = OrderedDict()
+        self._search_cache_lock = threading.Lock()
+    
+    def close(self):
+        """Shut down the worker pools and the HTTP session."""
+        self._upload_pool.shutdown()
+        self._disk_pool.shutdown()
+        self._asset_pool.shutdown()
+        self.session.close()
+    
+    def _refresh_token(self, force_refresh=False):
+        """Refresh the cached access token used for API calls."""
+        self.token, self._token_expiry = get_access_token(force_refresh=force_refresh)
+        self._headers["Authorization"] = f"Bearer {self.token}"
         
+    def _make_request(self, method, endpoint, data=None):
+        """Make HTTP request to Vision Warehouse API with retry logic."""
         url = f"{self.base_url}/{endpoint}"
+        token_refreshed = False
+        
+        # Serialize the payload once, compactly, instead of on every attempt
+        body = json.dumps(data, separators=(",", ":"), allow_nan=False).encode("utf-8") if data is not None else None
         
-        try:
-            if method == "POST":
-                response = requests.post(url, headers=headers, json=data, timeout=TIMEOUT)
-            elif method == "GET":
-                response = requests.get(url, headers=headers, timeout=TIMEOUT)
+        for attempt in range(MAX_RETRIES + 1):
+            if time.time() > self._token_expiry - TOKEN_REFRESH_MARGIN:
+                self._refresh_token()
+            
+            try:
+                if method == "POST":
+                    response = self.session.post(url, headers=self._headers, data=body, timeout=TIMEOUT)
+                elif method == "GET":
+                    response = self.session.get(url, headers=self._headers, timeout=TIMEOUT)
+                else:
+                    raise ValueError(f"Unsupported HTTP method: {method}")
+                
+                # Token may have been revoked or rotated; refresh once and retry
+                if response.status_code == 401 and not token_refreshed and attempt < MAX_RETRIES:
+                    self._refresh_token(force_refresh=True)
+                    token_refreshed = True
+                    continue
                 
-            response.raise_for_status()
-            return response.json()
+                if response.status_code not in RETRIABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                error = requests.exceptions.HTTPError(
+                    f"{response.status_code} {response.reason} for url: {url}", response=response
+                )
+            
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
             
-        except requests.exceptions.RequestException as e:
-            if retry_count < MAX_RETRIES:
-                logger.warning(f"Request failed, retrying... ({retry_count + 1}/{MAX_RETRIES})")
-                return self._make_request(method, endpoint, data, retry_count + 1)
-            raise Exception(f"Request failed after {MAX_RETRIES} retries: {e}")
+            if attempt < MAX_RETRIES:
+                logger.warning(f"Request failed, retrying... ({attempt + 1}/{MAX_RETRIES})")
+                time.sleep(2 ** attempt + random.random() * 0.1)
+        
+        raise Exception(f"Request failed after {MAX_RETRIES} retries: {error}")
     
     def create_corpus(self):
         """Create a corpus for image storage."""
@@ -94,27 +178,99 @@ class LogoSimilarityAnalyzer:
         """Process all images in directory and upload to Vision Warehouse."""
         logger.info("Starting image processing...")
         
-        # Get list of image files
-        image_files = []
-        for root, _, files in os.walk(image_dir):
-            for file in files:
-                if file.lower().endswith(SUPPORTED_FORMATS):
-                    image_files.append(os.path.join(root, file))
+        # Discover image files lazily so uploads start immediately
+        image_files = iter_images(image_dir, SUPPORTED_FORMATS)
+        progress = tqdm(unit="batch")
+        destination_prefix = f"logos/{datetime.now().strftime('%Y%m%d')}/"
+        
+        # Blobs left by a previous run are not uploaded again. The listing
+        # runs alongside the first disk reads instead of delaying them.
+        existing_blobs = self._asset_pool.submit(list_existing_blobs, bucket_name, destination_prefix)
         
-        # Process images in batches
-        for i in tqdm(range(0, len(image_files), BATCH_SIZE)):
-            batch = image_files[i:i + BATCH_SIZE]
+        # Process images in batches. Uploads of batch j overlap with asset
+        # creation of batch j-1. Each asset is created by its own request:
+        # the v1 API has no batch create, and assets:import expects a JSONL
+        # manifest whose line format is not publicly documented.
+        uploads = {}
+        pending = {}
+        for batch_index in itertools.count():
+            batch = list(itertools.islice(image_files, BATCH_SIZE))
+            if not batch:
+                break
             
-            # Upload batch to GCS
-            gcs_uris = []
-            for image_path in batch:
-                destination_blob = f"logos/{datetime.now().strftime('%Y%m%d')}/{os.path.basename(image_path)}"
-                gcs_uri = upload_to_gcs(bucket_name, image_path, destination_blob)
-                gcs_uris.append(gcs_uri)
+            # A small disk pool reads files ahead of the network uploads; each
+            # file's upload is queued on the upload pool as soon as it is read
+            uploads[batch_index] = [
+                chain_future(
+                    self._disk_pool.submit(read_file, image_path),
+                    functools.partial(
+                        self._queue_upload,
+                        bucket_name,
+                        image_path,
+                        destination_prefix + os.path.basename(image_path),
+                        existing_blobs
+                    )
+                )
+                for image_path in batch
+            ]
             
-            # Create assets in Vision Warehouse
-            for gcs_uri in gcs_uris:
-                self.create_asset(corpus_id, gcs_uri)
+            # Create assets for the previous batch while the current one uploads
+            if batch_index - 1 in uploads:
+                pending[batch_index - 1] = self._submit_assets(corpus_id, uploads.pop(batch_index - 1))
+            if batch_index - 2 in pending:
+                self._wait_for_assets(pending.pop(batch_index - 2))
+                progress.update()
+        
+        for batch_index in sorted(uploads):
+            pending[batch_index] = self._submit_assets(corpus_id, uploads.pop(batch_index))
+        for batch_index in sorted(pending):
+            self._wait_for_assets(pending.pop(batch_index))
+            progress.update()
+        progress.close()
+    
+    def _queue_upload(self, bucket_name, source_file_path, destination_blob_name, existing_blobs, data):
+        """Queue the upload of a file that has been read, once the bucket listing is done."""
+        return chain_future(
+            existing_blobs,
+            lambda blobs: self._upload_pool.submit(
+                INGEST_PRIORITY,
+                self._upload_with_retry,
+                bucket_name,
+                source_file_path,
+                destination_blob_name,
+                data,
+                blobs
+            )
+        )
+    
+    def _upload_with_retry(self, bucket_name, source_file_path, destination_blob_name, data, existing_blobs=None):
+        """Upload one file's contents to GCS with exponential backoff."""
+        existing_md5 = existing_blobs.get(destination_blob_name) if existing_blobs else None
+        content_type = mimetypes.guess_type(source_file_path)[0]
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                with self._sem.slot(INGEST_PRIORITY):
+                    return upload_bytes(bucket_name, data, destination_blob_name, content_type, existing_md5)
+            except Exception as e:
+                if attempt == MAX_RETRIES:
+                    raise Exception(f"Upload of {source_file_path} failed after {MAX_RETRIES} retries: {e}")
+                logger.warning(f"Upload of {source_file_path} failed, retrying... ({attempt + 1}/{MAX_RETRIES})")
+                time.sleep(2 ** attempt)
+    
+    def _upload_query_image(self, bucket_name, source_file_path, destination_blob_name):
+        """Upload a query image to GCS within the upload slot limit."""
+        with self._sem.slot(QUERY_PRIORITY):
+            return upload_to_gcs(bucket_name, source_file_path, destination_blob_name)
+    
+    def _submit_assets(self, corpus_id, upload_futures):
+        """Queue asset creation for a batch of uploaded images."""
+        return [self._asset_pool.submit(self.create_asset, corpus_id, future.result()) for future in upload_futures]
+    
+    @staticmethod
+    def _wait_for_assets(asset_futures):
+        """Block until every asset creation in a batch is done."""
+        for future in asset_futures:
+            future.result()
     
     def create_asset(self, corpus_id, gcs_uri):
         """Create an asset in the corpus."""
@@ -127,14 +283,47 @@ class LogoSimilarityAnalyzer:
         }
         return self._make_request("POST", endpoint, data)
     
+    def clear_cache(self):
+        """Drop all cached search results."""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+    
     def search_similar_images(self, index_endpoint_id, query_image_path, max_results=10):
-        """Search for similar images."""
+        """Search for similar images.
+        
+        Results are cached by query image content, so repeating a query
+        within SEARCH_CACHE_TTL skips the upload and the search call.
+        """
+        cache_key = (index_endpoint_id, hash_file(query_image_path).hexdigest(), max_results)
+        with self._search_cache_lock:
+            cached = self._search_cache.get(cache_key)
+            if cached is not None and time.time() - cached[0] < SEARCH_CACHE_TTL:
+                self._search_cache.move_to_end(cache_key)
+                return cached[1]
+        
+        result = self._search_similar_images(index_endpoint_id, query_image_path, max_results)
+        
+        with self._search_cache_lock:
+            self._search_cache[cache_key] = (time.time(), result)
+            self._search_cache.move_to_end(cache_key)
+            while len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        return result
+    
+    def _search_similar_images(self, index_endpoint_id, query_image_path, max_results):
+        """Upload the query image and run the similarity search."""
         endpoint = f"projects/{self.project_number}/locations/{self.location}/indexEndpoints/{index_endpoint_id}:findNeighbors"
         
         # Upload query image to GCS first
         bucket_name = f"{self.project_number}-query-images"
         destination_blob = f"query/{datetime.now().strftime('%Y%m%d')}/{os.path.basename(query_image_path)}"
-        gcs_uri = upload_to_gcs(bucket_name, query_image_path, destination_blob)
+        gcs_uri = self._upload_pool.submit(
+            QUERY_PRIORITY,
+            self._upload_query_image,
+            bucket_name,
+            query_image_path,
+            destination_blob
+        ).result()
         
         data = {
             "query_image": {
@@ -153,6 +342,7 @@ def main():
     parser.add_argument('--max-results', type=int, default=10, help='Maximum number of similar images to find')
     args = parser.parse_args()
     
+    analyzer = None
     try:
         # Initialize analyzer
         analyzer = LogoSimilarityAnalyzer()
@@ -192,6 +382,9 @@ def main():
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         raise
+    finally:
+        if analyzer is not None:
+            analyzer.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
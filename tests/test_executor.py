@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import Future
+from unittest import mock
+
+import pytest
+
+from utils import PriorityExecutor, PrioritySemaphore, chain_future
+
+
+def _wait_for_waiters(semaphore, count):
+    deadline = time.time() + 5
+    while len(semaphore._waiters) < count:
+        assert time.time() < deadline, 'waiters did not queue up'
+        time.sleep(0.001)
+
+
+def test_executor_runs_lowest_priority_first():
+    executor = PriorityExecutor(max_workers=1)
+    gate = threading.Event()
+    order = []
+    executor.submit(0, gate.wait)
+    futures = [
+        executor.submit(priority, order.append, name)
+        for priority, name in [(5, 'ingest'), (0, 'query'), (3, 'middle'), (0, 'query2')]
+    ]
+    gate.set()
+    for future in futures:
+        future.result(timeout=5)
+    executor.shutdown()
+
+    assert order == ['query', 'query2', 'middle', 'ingest']
+
+
+def test_executor_propagates_exceptions_and_rejects_work_after_shutdown():
+    executor = PriorityExecutor(max_workers=2)
+    future = executor.submit(0, int, 'not a number')
+    with pytest.raises(ValueError):
+        future.result(timeout=5)
+    executor.shutdown()
+
+    with pytest.raises(RuntimeError):
+        executor.submit(0, int, '1')
+
+
+def test_semaphore_hands_free_slot_to_lowest_priority_waiter():
+    semaphore = PrioritySemaphore(1)
+    semaphore.acquire()
+    order = []
+
+    def _take(priority):
+        with semaphore.slot(priority):
+            order.append(priority)
+
+    threads = []
+    for priority in (10, 10, 0):
+        thread = threading.Thread(target=_take, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        _wait_for_waiters(semaphore, len(threads))
+    semaphore.release()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert order == [0, 10, 10]
+    assert semaphore._value == 1
+
+
+def test_interrupted_waiter_leaves_the_queue():
+    semaphore = PrioritySemaphore(1)
+    semaphore.acquire()
+    with mock.patch.object(semaphore._cond, 'wait', side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            semaphore.acquire(priority=0)
+    assert semaphore._waiters == []
+
+    semaphore.release()
+    thread = threading.Thread(target=semaphore.acquire, args=(5,))
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_release_without_acquire_raises():
+    with pytest.raises(ValueError):
+        PrioritySemaphore(1).release()
+
+
+def test_chain_future_submits_with_the_first_result():
+    first = Future()
+    second = Future()
+    submit = mock.Mock(return_value=second)
+    chained = chain_future(first, submit)
+
+    first.set_result(b'data')
+    submit.assert_called_once_with(b'data')
+    assert not chained.done()
+    second.set_result('gs://bucket/blob')
+    assert chained.result(timeout=0) == 'gs://bucket/blob'
+
+
+def test_chain_future_skips_submit_when_the_first_future_fails():
+    first = Future()
+    submit = mock.Mock()
+    chained = chain_future(first, submit)
+
+    first.set_exception(OSError('unreadable'))
+    assert not submit.called
+    with pytest.raises(OSError):
+        chained.result(timeout=0)
@@ -0,0 +1,35 @@
+import os
+from unittest import mock
+
+from utils import files
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'')
+
+
+def test_iter_images_walks_subdirectories_and_matches_extensions(tmp_path):
+    for name in ['a.png', 'b.JPG', 'notes.txt', 'nested/c.jpeg', 'nested/deeper/d.Png', 'nested/e']:
+        _touch(tmp_path / name)
+
+    found = sorted(os.path.relpath(path, tmp_path) for path in files.iter_images(str(tmp_path)))
+
+    assert found == sorted(['a.png', 'b.JPG', os.path.join('nested', 'c.jpeg'),
+                            os.path.join('nested', 'deeper', 'd.Png')])
+
+
+def test_iter_images_skips_unreadable_subdirectories(tmp_path):
+    _touch(tmp_path / 'a.png')
+    _touch(tmp_path / 'locked' / 'b.png')
+    scandir = os.scandir
+
+    def _scandir(path):
+        if os.path.basename(path) == 'locked':
+            raise PermissionError(path)
+        return scandir(path)
+
+    with mock.patch.object(files.os, 'scandir', side_effect=_scandir):
+        found = list(files.iter_images(str(tmp_path)))
+
+    assert found == [str(tmp_path / 'a.png')]
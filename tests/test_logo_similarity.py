@@ -0,0 +1,73 @@
+import time
+from unittest import mock
+
+import pytest
+
+import logo_similarity
+from config import MAX_RETRIES
+
+
+@pytest.fixture
+def analyzer():
+    with mock.patch.object(logo_similarity, 'get_access_token', return_value=('token', time.time() + 3600)), \
+            mock.patch.object(logo_similarity.time, 'sleep'):
+        analyzer = logo_similarity.LogoSimilarityAnalyzer(project_number='123', location='us-central1')
+        analyzer.session = mock.MagicMock()
+        yield analyzer
+        analyzer.close()
+
+
+def _response(status_code, payload=None):
+    response = mock.MagicMock(status_code=status_code, reason='reason')
+    response.json.return_value = payload
+    return response
+
+
+def test_make_request_retries_transient_errors(analyzer):
+    analyzer.session.post.side_effect = [_response(503), _response(429), _response(200, {'name': 'op'})]
+
+    assert analyzer._make_request('POST', 'corpora', {'a': 1}) == {'name': 'op'}
+    assert analyzer.session.post.call_count == 3
+    assert analyzer.session.post.call_args.kwargs['data'] == b'{"a":1}'
+
+
+def test_make_request_gives_up_after_max_retries(analyzer):
+    analyzer.session.get.return_value = _response(500)
+
+    with pytest.raises(Exception, match=f'after {MAX_RETRIES} retries'):
+        analyzer._make_request('GET', 'corpora')
+    assert analyzer.session.get.call_count == MAX_RETRIES + 1
+
+
+def test_make_request_refreshes_token_once_on_401(analyzer):
+    analyzer.session.get.side_effect = [_response(401), _response(200, {})]
+
+    with mock.patch.object(logo_similarity, 'get_access_token',
+                           return_value=('fresh', time.time() + 3600)) as get_token:
+        assert analyzer._make_request('GET', 'corpora') == {}
+
+    get_token.assert_called_once_with(force_refresh=True)
+    assert analyzer._headers['Authorization'] == 'Bearer fresh'
+
+
+def test_process_images_retries_only_failed_uploads(analyzer, tmp_path):
+    for name in ['a.png', 'b.png', 'c.png']:
+        (tmp_path / name).write_bytes(name.encode())
+    attempts = {}
+
+    def _upload_bytes(bucket_name, data, destination_blob_name, content_type=None, existing_md5=None):
+        name = destination_blob_name.rsplit('/', 1)[-1]
+        attempts[name] = attempts.get(name, 0) + 1
+        if name == 'b.png' and attempts[name] == 1:
+            raise ConnectionError('reset')
+        assert data == name.encode()
+        return f'gs://{bucket_name}/{destination_blob_name}'
+
+    with mock.patch.object(logo_similarity, 'upload_bytes', side_effect=_upload_bytes), \
+            mock.patch.object(logo_similarity, 'list_existing_blobs', return_value={}), \
+            mock.patch.object(analyzer, 'create_asset') as create_asset:
+        analyzer.process_images(str(tmp_path), 'corpus', 'bucket')
+
+    assert attempts == {'a.png': 1, 'b.png': 2, 'c.png': 1}
+    uris = sorted(call.args[1].rsplit('/', 1)[-1] for call in create_asset.call_args_list)
+    assert uris == ['a.png', 'b.png', 'c.png']
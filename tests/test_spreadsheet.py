@@ -0,0 +1,43 @@
+from unittest import mock
+
+from utils import spreadsheet
+
+
+def _save(results, range_name='Sheet1!A1'):
+    service = mock.MagicMock()
+    with mock.patch.object(spreadsheet, '_get_service', return_value=service):
+        spreadsheet.save_to_spreadsheet(results, 'sheet-id', range_name, credentials=object())
+    values = service.spreadsheets.return_value.values.return_value
+    return values
+
+
+def test_header_includes_keys_from_all_rows():
+    values = _save([{'a': 1}, {'a': 2, 'b': 3}])
+
+    body = values.update.call_args.kwargs['body']
+    assert body['values'] == [['a', 'b'], [1, ''], [2, 3]]
+
+
+def test_clears_target_columns_before_writing():
+    values = _save([{'a': 1, 'b': 2}], range_name='Results!C5')
+
+    assert values.clear.call_args.kwargs['range'] == 'Results!C5:D'
+    assert values.update.call_args.kwargs['range'] == 'Results!C5'
+
+
+def test_large_results_are_written_in_chunks_at_explicit_ranges():
+    results = [{'n': i} for i in range(spreadsheet.CHUNK_ROWS * 2)]
+
+    values = _save(results)
+
+    ranges = [call.kwargs['range'] for call in values.update.call_args_list]
+    assert ranges == ['Sheet1!A1', 'Sheet1!A1001', 'Sheet1!A2001']
+    assert not values.append.called
+    written = [row for call in values.update.call_args_list for row in call.kwargs['body']['values']]
+    assert written == [['n']] + [[i] for i in range(spreadsheet.CHUNK_ROWS * 2)]
+
+
+def test_column_letters_round_trip():
+    for number in (1, 26, 27, 52, 703):
+        assert spreadsheet._column_number(spreadsheet._column_letters(number)) == number
+    assert spreadsheet._column_letters(28) == 'AB'
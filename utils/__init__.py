@@ -1,5 +1,7 @@
 from .auth import get_access_token
-from .gcs import upload_to_gcs
+from .executor import PriorityExecutor, PrioritySemaphore, chain_future
+from .files import iter_images, read_file, hash_file
+from .gcs import upload_to_gcs, upload_bytes, list_existing_blobs
 from .spreadsheet import save_to_spreadsheet
 
-__all__ = ['get_access_token', 'upload_to_gcs', 'save_to_spreadsheet']
\ No newline at end of file
+__all__ = ['get_access_token', 'iter_images', 'read_file', 'hash_file', 'PriorityExecutor', 'PrioritySemaphore', 'chain_future', 'upload_to_gcs', 'upload_bytes', 'list_existing_blobs', 'save_to_spreadsheet']
\ No newline at end of file
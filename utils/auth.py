@@ -1,18 +1,41 @@
-import subprocess
+import calendar
+import threading
+import time
+
+from google.auth import default
+from google.auth.exceptions import GoogleAuthError
+from google.auth.transport.requests import Request
 from google.oauth2 import service_account
 
-def get_access_token():
-    """Get access token for API calls using gcloud CLI."""
-    try:
-        result = subprocess.run(
-            ['gcloud', 'auth', 'print-access-token'],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        raise Exception(f'Failed to get access token: {e}')
+# Refresh the token this many seconds before it actually expires
+TOKEN_REFRESH_MARGIN = 60
+
+_lock = threading.Lock()
+_credentials = None
+_cached_token = None
+_cached_expiry = 0.0
+
+def get_access_token(force_refresh=False):
+    """Get access token for API calls using Application Default Credentials.
+
+    The token is cached at module level and only refreshed when it is close
+    to expiry or when force_refresh is set. Returns (token, expiry_timestamp).
+    """
+    global _credentials, _cached_token, _cached_expiry
+    with _lock:
+        if force_refresh or _cached_token is None or time.time() > _cached_expiry - TOKEN_REFRESH_MARGIN:
+            try:
+                if _credentials is None:
+                    _credentials, _ = default(scopes=['https://www.googleapis.com/auth/cloud-platform'])
+                _credentials.refresh(Request())
+            except GoogleAuthError as e:
+                raise Exception(f'Failed to get access token: {e}')
+            _cached_token = _credentials.token
+            if _credentials.expiry is not None:
+                _cached_expiry = calendar.timegm(_credentials.expiry.utctimetuple())
+            else:
+                _cached_expiry = time.time() + 3600
+        return _cached_token, _cached_expiry
 
 def get_credentials(credentials_path):
     """Get credentials from service account key file."""
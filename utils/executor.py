@@ -0,0 +1,150 @@
+import heapq
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+
+def chain_future(future, submit):
+    """Start submit(result) when future completes, without blocking a thread.
+
+    submit must return a Future. The returned Future resolves with its
+    result, or with the first exception raised along the chain.
+    """
+    chained = Future()
+
+    def _copy(source):
+        if source.cancelled():
+            chained.cancel()
+        elif source.exception() is not None:
+            chained.set_exception(source.exception())
+        else:
+            chained.set_result(source.result())
+
+    def _start(source):
+        if source.cancelled() or source.exception() is not None:
+            _copy(source)
+            return
+        try:
+            next_future = submit(source.result())
+        except BaseException as e:
+            chained.set_exception(e)
+            return
+        next_future.add_done_callback(_copy)
+
+    future.add_done_callback(_start)
+    return chained
+
+
+class PriorityExecutor:
+    """Thread pool that runs queued work with the lowest priority value first.
+
+    Work with equal priority runs in submission order.
+    """
+
+    def __init__(self, max_workers):
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, priority, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs) and return a Future for its result."""
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            self._queue.put((priority, next(self._counter), future, fn, args, kwargs))
+        return future
+
+    def shutdown(self, wait=True):
+        """Stop the workers once all queued work has run."""
+        with self._lock:
+            self._shutdown = True
+            for _ in self._threads:
+                self._queue.put((float('inf'), next(self._counter), None, None, None, None))
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self):
+        while True:
+            _, _, future, fn, args, kwargs = self._queue.get()
+            if future is None:
+                return
+            self._run(future, fn, args, kwargs)
+            # Drop the finished task so its arguments can be freed while this
+            # worker waits for the next one
+            del future, fn, args, kwargs
+
+    @staticmethod
+    def _run(future, fn, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+class PrioritySemaphore:
+    """Counting semaphore that hands free slots to the lowest priority value first.
+
+    Waiters with equal priority are served in arrival order.
+    """
+
+    def __init__(self, value):
+        self._initial = value
+        self._value = value
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def acquire(self, priority=0):
+        """Block until a slot is free and no higher priority waiter is queued."""
+        with self._cond:
+            waiter = (priority, next(self._counter))
+            heapq.heappush(self._waiters, waiter)
+            try:
+                while self._value == 0 or self._waiters[0] != waiter:
+                    self._cond.wait()
+            except BaseException:
+                # Interrupted while waiting; drop out of the queue so later
+                # waiters are not stuck behind this entry
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._waiters)
+            self._value -= 1
+            if self._value and self._waiters:
+                self._cond.notify_all()
+
+    def release(self):
+        """Free a slot and wake the waiters."""
+        with self._cond:
+            if self._value >= self._initial:
+                raise ValueError('semaphore released too many times')
+            self._value += 1
+            self._cond.notify_all()
+
+    def slot(self, priority=0):
+        """Return a reusable context manager holding one slot at priority."""
+        return _Slot(self, priority)
+
+
+class _Slot:
+    def __init__(self, semaphore, priority):
+        self._semaphore = semaphore
+        self._priority = priority
+
+    def __enter__(self):
+        self._semaphore.acquire(self._priority)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._semaphore.release()
\ No newline at end of file
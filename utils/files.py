@@ -0,0 +1,38 @@
+import hashlib
+import os
+
+def iter_images(source_dir, extensions=('.jpg', '.jpeg', '.png')):
+    """Yield paths of image files under source_dir, recursively."""
+    extensions = frozenset(extensions)
+    
+    def _walk(entries):
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    # Skip subdirectories that cannot be read, as os.walk does
+                    try:
+                        subdirectory_entries = os.scandir(entry.path)
+                    except OSError:
+                        continue
+                    yield from _walk(subdirectory_entries)
+                    continue
+                # Only lowercase the suffix, and only stat entries that match
+                name = entry.name
+                dot = name.rfind('.')
+                if dot >= 0 and name[dot:].lower() in extensions and entry.is_file():
+                    yield entry.path
+    
+    return _walk(os.scandir(source_dir))
+
+def read_file(file_path):
+    """Read a file's contents into memory."""
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+def hash_file(file_path, algorithm='sha256'):
+    """Hash a file's contents in 64 KiB reads and return the hash object."""
+    file_hash = hashlib.new(algorithm)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash
\ No newline at end of file
@@ -1,24 +1,85 @@
 from google.cloud import storage
+import base64
+import hashlib
+import mimetypes
 import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .files import iter_images
+
+# Files at least this large are sent as a chunked resumable upload; the
+# chunk size must be a multiple of 256 KiB
+CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+
+# One storage client per thread, reused across uploads
+_local = threading.local()
+
+def _get_client():
+    """Return the storage client for the current thread, creating it once."""
+    client = getattr(_local, 'client', None)
+    if client is None:
+        client = _local.client = storage.Client()
+    return client
 
 def upload_to_gcs(bucket_name, source_file_path, destination_blob_name):
     """Upload a file to Google Cloud Storage."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+    bucket = _get_client().bucket(bucket_name)
     blob = bucket.blob(destination_blob_name)
 
-    blob.upload_from_filename(source_file_path)
+    # Small logos go in a single multipart request. Large files are sent in
+    # chunks so at most one chunk is held in memory at a time, instead of
+    # the library's 100 MiB default
+    size = os.path.getsize(source_file_path)
+    if size >= CHUNKED_UPLOAD_THRESHOLD:
+        blob.chunk_size = UPLOAD_CHUNK_SIZE
+    with open(source_file_path, 'rb', buffering=1024 * 1024) as f:
+        blob.upload_from_file(f, size=size, content_type=mimetypes.guess_type(source_file_path)[0])
     return f'gs://{bucket_name}/{destination_blob_name}'
 
-def upload_directory_to_gcs(bucket_name, source_dir, destination_prefix=''):
-    """Upload all files in a directory to GCS."""
-    uploaded_files = []
-    for root, _, files in os.walk(source_dir):
-        for file in files:
-            if file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                source_path = os.path.join(root, file)
-                relative_path = os.path.relpath(source_path, source_dir)
-                destination_path = os.path.join(destination_prefix, relative_path)
-                gcs_uri = upload_to_gcs(bucket_name, source_path, destination_path)
-                uploaded_files.append(gcs_uri)
-    return uploaded_files
\ No newline at end of file
+def list_existing_blobs(bucket_name, prefix):
+    """Return a mapping of blob name to MD5 hash for blobs under prefix."""
+    blobs = _get_client().list_blobs(bucket_name, prefix=prefix, fields='items(name,md5Hash),nextPageToken')
+    return {blob.name: blob.md5_hash for blob in blobs}
+
+def upload_bytes(bucket_name, data, destination_blob_name, content_type=None, existing_md5=None):
+    """Upload in-memory file contents to Google Cloud Storage.
+
+    If existing_md5 (as reported by GCS) matches the MD5 of data, the blob
+    is already up to date and nothing is sent.
+    """
+    if existing_md5 is not None and existing_md5 == base64.b64encode(hashlib.md5(data).digest()).decode('ascii'):
+        return f'gs://{bucket_name}/{destination_blob_name}'
+
+    bucket = _get_client().bucket(bucket_name)
+    blob = bucket.blob(destination_blob_name)
+    blob.upload_from_string(data, content_type=content_type or 'application/octet-stream')
+    return f'gs://{bucket_name}/{destination_blob_name}'
+
+def upload_directory_to_gcs(bucket_name, source_dir, destination_prefix='', max_workers=16, slot=None):
+    """Upload all images in a directory to GCS concurrently.
+
+    At most 2 * max_workers files are queued at a time, so the directory is
+    walked as uploads complete. If slot is given (e.g. a PrioritySemaphore
+    slot), each upload holds it, sharing a global in-flight limit.
+    """
+    def _upload(source_path):
+        relative_path = os.path.relpath(source_path, source_dir)
+        destination_path = os.path.join(destination_prefix, relative_path)
+        if slot is None:
+            return upload_to_gcs(bucket_name, source_path, destination_path)
+        with slot:
+            return upload_to_gcs(bucket_name, source_path, destination_path)
+    
+    results = []
+    window = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for source_path in iter_images(source_dir):
+            if len(window) >= 2 * max_workers:
+                results.append(window.popleft().result())
+            window.append(executor.submit(_upload, source_path))
+        while window:
+            results.append(window.popleft().result())
+    return results
\ No newline at end of file
@@ -1,25 +1,77 @@
-import pandas as pd
+import re
+
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
 
+# Maximum number of rows sent per Sheets API request
+CHUNK_ROWS = 1000
+
+# Built Sheets services keyed by credentials, reused across calls
+_service_cache = {}
+
+def _get_service(credentials):
+    """Return a cached Sheets API service for the given credentials."""
+    key = id(credentials)
+    service = _service_cache.get(key)
+    if service is None:
+        service = build('sheets', 'v4', credentials=credentials, cache_discovery=False, static_discovery=True)
+        _service_cache[key] = service
+    return service
+
+def _column_number(letters):
+    """Convert a column name such as 'AB' to its 1-based number."""
+    number = 0
+    for letter in letters.upper():
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+def _column_letters(number):
+    """Convert a 1-based column number to its name, e.g. 28 -> 'AB'."""
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def _parse_start(range_name):
+    """Split an A1 range into (sheet prefix, start column number, start row)."""
+    sheet, _, cells = range_name.rpartition('!')
+    prefix = f'{sheet}!' if sheet else ''
+    match = re.match(r'([A-Za-z]+)(\d+)', cells)
+    if match is None:
+        return prefix, 1, 1
+    return prefix, _column_number(match.group(1)), int(match.group(2))
+
 def save_to_spreadsheet(results, spreadsheet_id, range_name, credentials):
-    """Save results to Google Spreadsheet."""
-    service = build('sheets', 'v4', credentials=credentials)
+    """Save results to Google Spreadsheet.
+
+    Existing values in the target columns from the start row down are
+    cleared first, so a shorter run leaves no stale rows behind.
+    """
+    if not results:
+        return
     
-    # Convert results to DataFrame
-    df = pd.DataFrame(results)
+    service = _get_service(credentials)
     
-    # Prepare values for sheets
-    values = [df.columns.values.tolist()] + df.values.tolist()
+    # Prepare values for sheets, with a header covering keys from every row
+    columns = list(dict.fromkeys(column for row in results for column in row))
+    values = [columns] + [[row.get(column, '') for column in columns] for row in results]
     
-    body = {
-        'values': values
-    }
+    prefix, start_column, start_row = _parse_start(range_name)
+    first_column = _column_letters(start_column)
+    last_column = _column_letters(start_column + len(columns) - 1)
     
-    # Update spreadsheet
-    service.spreadsheets().values().update(
+    service.spreadsheets().values().clear(
         spreadsheetId=spreadsheet_id,
-        range=range_name,
-        valueInputOption='RAW',
-        body=body
-    ).execute()
\ No newline at end of file
+        range=f'{prefix}{first_column}{start_row}:{last_column}',
+        body={}
+    ).execute()
+    
+    # Write in chunks at explicit ranges to stay under the request size limit
+    for start in range(0, len(values), CHUNK_ROWS):
+        service.spreadsheets().values().update(
+            spreadsheetId=spreadsheet_id,
+            range=f'{prefix}{first_column}{start_row + start}',
+            valueInputOption='RAW',
+            body={'values': values[start:start + CHUNK_ROWS]}
+        ).execute()
\ No newline at end of file